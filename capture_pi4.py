@@ -24,27 +24,41 @@ Usage examples:
 Requirements:
   - Raspberry Pi OS with libcamera (Bullseye/Bookworm or later)
   - python3-picamera2 package (see README in this script)
-  - Optional: RPi.GPIO for button support
+  - Optional: gpiozero (preferred) or RPi.GPIO for button support
   - Optional: Pillow (PIL) to stamp date/time onto images
   - scp/ssh command-line tools for remote uploads (or install/enable them on the Pi)
 """
 import argparse
+import bisect
 import os
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import subprocess
 import shutil
+import shlex
+import tempfile
 import html
 
 try:
-    from picamera2 import Picamera2
+    from picamera2 import Picamera2, MappedArray
+    import numpy as np
 except Exception as e:
     print("Error importing Picamera2:", e)
     print("Install picamera2 (see README in this script). Exiting.")
     sys.exit(1)
 
-# Optional import for button mode
+# Optional imports for button mode. gpiozero is preferred: its bounce_time
+# waits for the line to stabilize, where RPi.GPIO's bouncetime only blanks
+# later edges, so presses during contact bounce can be lost entirely.
+try:
+    from gpiozero import Button
+    GPIOZERO_AVAILABLE = True
+except Exception:
+    GPIOZERO_AVAILABLE = False
+
 try:
     import RPi.GPIO as GPIO
     GPIO_AVAILABLE = True
@@ -58,19 +72,126 @@ try:
 except Exception:
     PIL_AVAILABLE = False
 
-def timestamped_filename(outdir, prefix="image", ext="jpg"):
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")[:-3]
-    return os.path.join(outdir, f"{prefix}_{ts}.{ext}")
+# Optional paramiko import for uploads. A persistent SFTP session pipelines
+# many small file writes over one channel; per-file scp forks a process and
+# runs the SFTP protocol cold every time.
+try:
+    import paramiko
+    PARAMIKO_AVAILABLE = True
+except Exception:
+    PARAMIKO_AVAILABLE = False
+
+# Long-lived SFTP session shared by every upload in the run. Opened in
+# main() when scp is enabled and paramiko is installed; stays None (and
+# uploads use scp subprocesses) otherwise.
+_SFTP = None
+_SFTP_CLIENT = None
+
+# Socket for SSH connection sharing. One master connection is opened at
+# startup and every later ssh/scp call multiplexes over it instead of paying
+# its own TCP + key exchange + auth round trips.
+_SSH_CTL_PATH = f"/tmp/owlcam-ssh-{os.getpid()}.sock"
+_SSH_CTL_OPTS = ["-o", f"ControlPath={_SSH_CTL_PATH}"]
+
+def _start_ssh_master(remote_user, remote_host, remote_path=None, ssh_key=None, ssh_port=22):
+    """Spawn the background SSH master connection (ssh -M -N -f)."""
+    if shutil.which("ssh") is None:
+        return False
+    cmd = ["ssh", "-M", "-N", "-f",
+           "-o", "ControlMaster=yes",
+           "-o", "ControlPersist=10m",
+           "-o", f"ControlPath={_SSH_CTL_PATH}",
+           "-p", str(ssh_port)]
+    if ssh_key:
+        cmd.extend(["-i", ssh_key])
+    cmd.append(f"{remote_user}@{remote_host}")
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return True
+    except subprocess.CalledProcessError as e:
+        print("Could not open SSH master connection (uploads will connect per call):", e)
+        return False
+
+def _stop_ssh_master(remote_user, remote_host, remote_path=None, ssh_key=None, ssh_port=22, _dir_ok=False):
+    """Close the master connection opened by _start_ssh_master, if any."""
+    if not os.path.exists(_SSH_CTL_PATH):
+        return
+    subprocess.run(["ssh", "-O", "exit", "-o", f"ControlPath={_SSH_CTL_PATH}",
+                    f"{remote_user}@{remote_host}"],
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def _open_sftp(remote_user, remote_host, remote_path, ssh_key=None, ssh_port=22, _dir_ok=False):
+    """Open the persistent SFTP session. Returns True when uploads can use it."""
+    global _SFTP, _SFTP_CLIENT
+    if not PARAMIKO_AVAILABLE:
+        return False
+    try:
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(remote_host, port=ssh_port, username=remote_user,
+                       key_filename=ssh_key, timeout=15)
+        sftp = client.open_sftp()
+        try:
+            sftp.mkdir(remote_path)
+        except IOError:
+            pass  # already exists
+        _SFTP_CLIENT = client
+        _SFTP = sftp
+        print("Opened persistent SFTP session to", remote_host)
+        return True
+    except Exception as e:
+        print("Could not open SFTP session (uploads will use scp):", e)
+        return False
+
+def _close_sftp():
+    global _SFTP, _SFTP_CLIENT
+    if _SFTP is not None:
+        try:
+            _SFTP.close()
+        except Exception:
+            pass
+        _SFTP = None
+    if _SFTP_CLIENT is not None:
+        try:
+            _SFTP_CLIENT.close()
+        except Exception:
+            pass
+        _SFTP_CLIENT = None
+
+def timestamped_filename(out_prefix, prefix="image", ext="jpg"):
+    """out_prefix is the output directory with a trailing separator,
+    precomputed once by the caller - plain concatenation is all the
+    os.path.join machinery this hot path actually needs."""
+    # time.strftime skips the datetime object construction; the old [:-3]
+    # slice was a bug that chopped the seconds down to one digit
+    ts = time.strftime("%Y%m%d_%H%M%S")
+    return f"{out_prefix}{prefix}_{ts}.{ext}"
 
 def ensure_outdir(path):
     os.makedirs(path, exist_ok=True)
 
+# tmpfs scratch area for in-flight captures. Writing the JPEG straight to
+# the SD card stalls the capture loop on the card's flush; writing to
+# /dev/shm is memory-speed and the SD write happens later off the hot path.
+SCRATCH = "/dev/shm/owlcam"
+
+def _scratch_dir():
+    """Return the tmpfs scratch directory, or None when /dev/shm is absent."""
+    if not os.path.isdir("/dev/shm"):
+        return None
+    try:
+        os.makedirs(SCRATCH, exist_ok=True)
+        return SCRATCH
+    except OSError:
+        return None
+
 def _ensure_remote_dir(remote_user, remote_host, remote_path, ssh_key=None, ssh_port=22):
     """Ensure the remote directory exists (uses ssh to run mkdir -p)."""
     if shutil.which("ssh") is None:
         print("ssh command not found; cannot ensure remote directory exists.")
         return False
     cmd = ["ssh", "-p", str(ssh_port)]
+    cmd.extend(_SSH_CTL_OPTS)
     if ssh_key:
         cmd.extend(["-i", ssh_key])
     # Quote remote_path for the remote shell
@@ -84,23 +205,36 @@ def _ensure_remote_dir(remote_user, remote_host, remote_path, ssh_key=None, ssh_
         print("Failed to ensure remote directory:", e)
         return False
 
-def _scp_upload(local_path, remote_user, remote_host, remote_path, ssh_key=None, ssh_port=22):
-    """Upload a single file to remote server via scp. remote_path should be a directory."""
+def _scp_upload(local_path, remote_user, remote_host, remote_path, ssh_key=None, ssh_port=22, _dir_ok=False):
+    """Upload a single file to the remote server. remote_path should be a
+    directory. Uses the persistent SFTP session when one is open, otherwise
+    falls back to an scp subprocess."""
+    if _SFTP is not None:
+        try:
+            _SFTP.put(local_path, remote_path.rstrip("/") + "/" + os.path.basename(local_path))
+            print("Uploaded (sftp):", local_path, "->", f"{remote_user}@{remote_host}:{remote_path}")
+            return True
+        except Exception as e:
+            print("SFTP upload failed (falling back to scp):", e)
+
     if shutil.which("scp") is None:
         print("scp command not found; cannot upload file.")
         return False
 
-    # Ensure remote directory exists
-    ok = _ensure_remote_dir(remote_user, remote_host, remote_path, ssh_key=ssh_key, ssh_port=ssh_port)
-    if not ok:
-        print("Skipping upload; could not ensure remote directory.")
-        return False
+    # Ensure remote directory exists (skipped when main() already did it once
+    # for the whole run - that used to cost an extra ssh round trip per file)
+    if not _dir_ok:
+        ok = _ensure_remote_dir(remote_user, remote_host, remote_path, ssh_key=ssh_key, ssh_port=ssh_port)
+        if not ok:
+            print("Skipping upload; could not ensure remote directory.")
+            return False
 
     # Build remote target path with same basename
     basename = os.path.basename(local_path)
     remote_target = f"{remote_user}@{remote_host}:{remote_path.rstrip('/')}/{basename}"
 
     cmd = ["scp", "-P", str(ssh_port)]
+    cmd.extend(_SSH_CTL_OPTS)
     if ssh_key:
         cmd.extend(["-i", ssh_key])
     cmd.extend([local_path, remote_target])
@@ -114,78 +248,275 @@ def _scp_upload(local_path, remote_user, remote_host, remote_path, ssh_key=None,
         print("SCP upload failed:", stderr.strip())
         return False
 
+def _bulk_tar_upload(local_paths, remote_user, remote_host, remote_path, ssh_key=None, ssh_port=22, _dir_ok=False):
+    """Upload a batch of files by streaming tar into ssh.
+
+    Per-file scp pays a process fork and a full SSH handshake every time;
+    piping `tar -cf -` into `ssh ... tar -xf -` moves the whole batch over
+    one connection.
+    """
+    if shutil.which("ssh") is None or shutil.which("tar") is None:
+        print("ssh/tar command not found; cannot bulk upload files.")
+        return False
+    if not local_paths:
+        return True
+
+    # Ensure remote directory exists (once per run when main() set _dir_ok)
+    if not _dir_ok:
+        ok = _ensure_remote_dir(remote_user, remote_host, remote_path, ssh_key=ssh_key, ssh_port=ssh_port)
+        if not ok:
+            print("Skipping bulk upload; could not ensure remote directory.")
+            return False
+
+    common_dir = os.path.dirname(local_paths[0]) or "."
+    basenames = [os.path.basename(p) for p in local_paths]
+    tar_cmd = ["tar", "-cf", "-", "-C", common_dir] + basenames
+    ssh_cmd = ["ssh", "-p", str(ssh_port)]
+    ssh_cmd.extend(_SSH_CTL_OPTS)
+    if ssh_key:
+        ssh_cmd.extend(["-i", ssh_key])
+    ssh_cmd.append(f"{remote_user}@{remote_host}")
+    ssh_cmd.append("tar -xf - -C " + shlex.quote(remote_path))
+    try:
+        tar_proc = subprocess.Popen(tar_cmd, stdout=subprocess.PIPE)
+        ssh_proc = subprocess.Popen(ssh_cmd, stdin=tar_proc.stdout, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        tar_proc.stdout.close()
+        _, stderr = ssh_proc.communicate()
+        tar_proc.wait()
+        if tar_proc.returncode != 0 or ssh_proc.returncode != 0:
+            print("Bulk upload failed:", stderr.decode("utf-8", "replace").strip())
+            return False
+        print(f"Uploaded {len(basenames)} files ->", f"{remote_user}@{remote_host}:{remote_path}")
+        return True
+    except Exception as e:
+        print("Bulk upload failed:", e)
+        return False
+
+def _rsync_batch_upload(local_paths, remote_user, remote_host, remote_path, ssh_key=None, ssh_port=22, _dir_ok=False):
+    """Upload a batch of files with rsync --files-from.
+
+    Unlike the tar pipe this is idempotent: rsync skips files the server
+    already has (same mtime+size), so a run that crashed mid-upload doesn't
+    re-send everything when it restarts.
+    """
+    if shutil.which("rsync") is None:
+        return False
+    if not local_paths:
+        return True
+
+    src_dir = os.path.dirname(local_paths[0]) or "."
+    ssh_cmd = f"ssh -p {ssh_port} " + " ".join(_SSH_CTL_OPTS)
+    if ssh_key:
+        ssh_cmd += " -i " + shlex.quote(ssh_key)
+
+    list_file = None
+    try:
+        with tempfile.NamedTemporaryFile("w", suffix=".list", delete=False) as fh:
+            fh.write("\n".join(os.path.basename(p) for p in local_paths) + "\n")
+            list_file = fh.name
+        cmd = ["rsync", "-az", "-e", ssh_cmd, f"--files-from={list_file}",
+               src_dir + "/", f"{remote_user}@{remote_host}:{remote_path.rstrip('/')}/"]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        print(f"Synced {len(local_paths)} files ->", f"{remote_user}@{remote_host}:{remote_path}")
+        return True
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode("utf-8", "replace") if isinstance(e.stderr, (bytes, bytearray)) else str(e.stderr)
+        print("rsync batch upload failed:", stderr.strip())
+        return False
+    finally:
+        if list_file:
+            os.unlink(list_file)
+
+def _batch_upload(local_paths, **scp_config):
+    """Flush one upload batch: rsync when installed (restart-safe), tar pipe otherwise."""
+    if _rsync_batch_upload(local_paths, **scp_config):
+        return True
+    return _bulk_tar_upload(local_paths, **scp_config)
+
+# One pre-formatted card per image: a single .format call per entry instead
+# of four separate f-strings, with html.escape run once per name
+_CARD_TPL = (
+    "    <div class='card'>\n"
+    "      <a href='{p}'><img src='{p}' alt='{p}'></a>\n"
+    "      <div class='meta'>{p} &middot; {m} &middot; {s} KB</div>\n"
+    "    </div>"
+)
+
+class IndexBuilder:
+    """
+    Incrementally maintained index.html.
+
+    The old build_index_html re-listed the directory and re-stat'ed every
+    file on every call, and timelapse mode called it once per frame - that
+    is O(N) stats per frame on the SD card. This keeps the entries in a
+    sorted in-memory list so each new frame costs one os.stat and one
+    insert, and the page is only rewritten every so often.
+    """
+
+    def __init__(self, outdir, title="Owl box Timelapse Image Index"):
+        self.outdir = outdir
+        self.title = title
+        # (mtime, name, size) tuples kept sorted oldest-first by insort
+        self.entries = []
+        safe_title = html.escape(title)
+        self.header = "\n".join([
+            "<!doctype html>",
+            "<html>",
+            "<head>",
+            f"  <meta charset='utf-8'>",
+            f"  <title>{safe_title}</title>",
+            "  <meta name='viewport' content='width=device-width,initial-scale=1'>",
+            "  <style>",
+            "    body { font-family: Arial, sans-serif; margin: 0; padding: 1rem; }",
+            "    .grid { display: grid; grid-template-columns: repeat(auto-fill,minmax(200px,1fr)); grid-gap: 10px; }",
+            "    .card { border: 1px solid #ddd; padding: 6px; background: #fff; }",
+            "    img { max-width: 100%; height: auto; display: block; }",
+            "    .meta { font-size: 0.85rem; color: #555; margin-top: 6px; }",
+            "  </style>",
+            "</head>",
+            "<body>",
+            f"  <h1>{safe_title}</h1>",
+            "  <div class='grid'>",
+            ""
+        ])
+        self.footer = "\n".join([
+            "  </div>",
+            "</body>",
+            "</html>"
+        ])
+
+    def add(self, path):
+        """Record one image file; a single stat, no directory rescan."""
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            print("Could not stat for index:", e)
+            return
+        bisect.insort(self.entries, (st.st_mtime, os.path.basename(path), st.st_size))
+
+    def write(self):
+        """Write index.html from the cached entries (newest first)."""
+        cards = "\n".join(
+            _CARD_TPL.format(p=html.escape(name),
+                             m=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mtime)),
+                             s=size // 1024)
+            for mtime, name, size in reversed(self.entries))
+
+        index_path = os.path.join(self.outdir, "index.html")
+        try:
+            with open(index_path, "w", encoding="utf-8") as fh:
+                fh.write(self.header + cards + "\n" + self.footer)
+            print("Built index:", index_path)
+            return index_path
+        except Exception as e:
+            print("Failed to write index.html:", e)
+            return None
+
 def build_index_html(outdir, title="Owl box Timelapse Image Index"):
     """
     Build a simple index.html in outdir that lists image files found there.
     Returns the path to the generated index file.
+
+    One-shot wrapper around IndexBuilder for the single/button modes.
     """
-    image_exts = ("jpg", "jpeg", "png", "gif", "webp", "mp4")
+    image_exts = {"jpg", "jpeg", "png", "gif", "webp", "mp4"}
+    builder = IndexBuilder(outdir, title=title)
     try:
-        entries = [f for f in os.listdir(outdir) if os.path.splitext(f)[1].lstrip(".").lower() in image_exts]
+        # scandir gives us the name and (cached) stat in one pass; the old
+        # listdir + getmtime + getsize version cost three stat syscalls per
+        # file, which dominates on an SD card once the directory fills up
+        with os.scandir(outdir) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                if entry.name.rsplit(".", 1)[-1].lower() not in image_exts:
+                    continue
+                st = entry.stat()
+                bisect.insort(builder.entries, (st.st_mtime, entry.name, st.st_size))
     except FileNotFoundError:
-        entries = []
-
-    # Sort by modification time descending (newest first)
-    entries.sort(key=lambda fn: os.path.getmtime(os.path.join(outdir, fn)), reverse=True)
-
-    # Basic HTML
-    safe_title = html.escape(title)
-    html_lines = [
-        "<!doctype html>",
-        "<html>",
-        "<head>",
-        f"  <meta charset='utf-8'>",
-        f"  <title>{safe_title}</title>",
-        "  <meta name='viewport' content='width=device-width,initial-scale=1'>",
-        "  <style>",
-        "    body { font-family: Arial, sans-serif; margin: 0; padding: 1rem; }",
-        "    .grid { display: grid; grid-template-columns: repeat(auto-fill,minmax(200px,1fr)); grid-gap: 10px; }",
-        "    .card { border: 1px solid #ddd; padding: 6px; background: #fff; }",
-        "    img { max-width: 100%; height: auto; display: block; }",
-        "    .meta { font-size: 0.85rem; color: #555; margin-top: 6px; }",
-        "  </style>",
-        "</head>",
-        "<body>",
-        f"  <h1>{safe_title}</h1>",
-        "  <div class='grid'>"
-    ]
-
-    for fn in entries:
-        path = html.escape(fn)
-        full_path = os.path.join(outdir, fn)
+        pass
+    return builder.write()
+
+# ImageFont.truetype parses the whole .ttf file; at one annotation per frame
+# that was a disk read and font parse per capture. Resolved fonts are cached
+# here keyed by (font_path, font_size).
+_FONT_CACHE = {}
+
+def _load_annotation_font(width, font_path=None):
+    """Pick a font sized for the frame width - provided path, then DejaVuSans,
+    otherwise PIL's default. Cached, so the font file is only parsed once."""
+    font_size = max(14, width // 40)
+    key = (font_path, font_size)
+    font = _FONT_CACHE.get(key)
+    if font is not None:
+        return font
+    if font_path:
         try:
-            mtime = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(os.path.getmtime(full_path)))
-            size_kb = os.path.getsize(full_path) // 1024
+            font = ImageFont.truetype(font_path, font_size)
         except Exception:
-            mtime = ""
-            size_kb = ""
-        html_lines.extend([
-            "    <div class='card'>",
-            f"      <a href='{path}'><img src='{path}' alt='{path}'></a>",
-            f"      <div class='meta'>{path} &middot; {mtime} &middot; {size_kb} KB</div>",
-            "    </div>"
-        ])
+            font = None
+    if font is None:
+        # try common system font
+        try:
+            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
+        except Exception:
+            font = None
+    if font is None:
+        font = ImageFont.load_default()
+    _FONT_CACHE[key] = font
+    return font
+
+def _draw_timestamp(img, text, font_path=None):
+    """Draw text in the bottom-right corner of a PIL image (in place)."""
+    draw = ImageDraw.Draw(img)
+    width, height = img.size
+    font = _load_annotation_font(width, font_path=font_path)
+
+    # Measure text
+    try:
+        text_bbox = draw.textbbox((0, 0), text, font=font)
+        text_w = text_bbox[2] - text_bbox[0]
+        text_h = text_bbox[3] - text_bbox[1]
+    except Exception:
+        text_w, text_h = draw.textsize(text, font=font)
+
+    margin = max(8, width // 200)
+    x = width - text_w - margin
+    y = height - text_h - margin
 
-    html_lines.extend([
-        "  </div>",
-        "</body>",
-        "</html>"
-    ])
+    # Draw background rectangle for readability
+    rect_pad = max(4, margin // 2)
+    rect_coords = [x - rect_pad, y - rect_pad, x + text_w + rect_pad, y + text_h + rect_pad]
+    draw.rectangle(rect_coords, fill=(0, 0, 0))
 
-    index_path = os.path.join(outdir, "index.html")
+    # Draw text in white
+    draw.text((x, y), text, font=font, fill=(255, 255, 255))
+
+def _stamp_callback(request):
+    """
+    Picamera2 pre_callback: draw the timestamp on the raw frame before it
+    is JPEG-encoded. The old path decoded the finished JPEG, drew on it and
+    re-encoded at quality=85 - an extra decode + encode per frame and a
+    second round of compression loss. Drawing here costs neither.
+    """
+    if not PIL_AVAILABLE:
+        return
+    text = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     try:
-        with open(index_path, "w", encoding="utf-8") as fh:
-            fh.write("\n".join(html_lines))
-        print("Built index:", index_path)
-        return index_path
+        with MappedArray(request, "main") as m:
+            img = Image.fromarray(m.array)
+            _draw_timestamp(img, text)
+            m.array[:] = np.asarray(img)
     except Exception as e:
-        print("Failed to write index.html:", e)
-        return None
+        print("Failed to stamp frame:", e)
 
 def _annotate_image_with_timestamp(image_path, text=None, font_path=None):
     """
     Annotate the saved image with a timestamp (draw text on the image).
     Uses Pillow (PIL). If PIL is not available, this is a no-op.
+
+    Fallback for when the in-camera pre_callback can't be used; it pays a
+    full JPEG decode and re-encode per file.
     """
     if not PIL_AVAILABLE:
         print("Pillow (PIL) not available; skipping image annotation.")
@@ -196,66 +527,28 @@ def _annotate_image_with_timestamp(image_path, text=None, font_path=None):
 
     try:
         img = Image.open(image_path).convert("RGB")
-        draw = ImageDraw.Draw(img)
-        width, height = img.size
-
-        # Choose font - try provided font_path, then DejaVuSans, otherwise default
-        font_size = max(14, width // 40)
-        font = None
-        tried = []
-        if font_path:
-            tried.append(font_path)
-            try:
-                font = ImageFont.truetype(font_path, font_size)
-            except Exception:
-                font = None
-        if font is None:
-            # try common system font
-            common = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
-            tried.append(common)
-            try:
-                font = ImageFont.truetype(common, font_size)
-            except Exception:
-                font = None
-        if font is None:
-            font = ImageFont.load_default()
-
-        # Measure text
-        try:
-            text_bbox = draw.textbbox((0, 0), text, font=font)
-            text_w = text_bbox[2] - text_bbox[0]
-            text_h = text_bbox[3] - text_bbox[1]
-        except Exception:
-            text_w, text_h = draw.textsize(text, font=font)
-
-        margin = max(8, width // 200)
-        x = width - text_w - margin
-        y = height - text_h - margin
-
-        # Draw background rectangle for readability
-        rect_pad = max(4, margin // 2)
-        rect_coords = [x - rect_pad, y - rect_pad, x + text_w + rect_pad, y + text_h + rect_pad]
-        draw.rectangle(rect_coords, fill=(0, 0, 0))
+        _draw_timestamp(img, text, font_path=font_path)
 
-        # Draw text in white
-        draw.text((x, y), text, font=font, fill=(255, 255, 255))
-
-        # Overwrite original file (keep JPEG quality reasonable)
-        img.save(image_path, quality=85)
+        # Overwrite original file (keep JPEG quality reasonable). Skip the
+        # encoder's slow optimize/progressive passes - on the Pi they cost
+        # real CPU time for no visible gain at this quality.
+        img.save(image_path, "JPEG", quality=85, optimize=False, subsampling=2, progressive=False)
         return True
     except Exception as e:
         print("Failed to annotate image:", e)
         return False
 
-def single_capture(picam2, outdir, scp_config=None, build_index=False, index_title="Image Index"):
+def single_capture(picam2, outdir, scp_config=None, build_index=False, index_title="Image Index", annotate=True):
     ensure_outdir(outdir)
-    fname = timestamped_filename(outdir)
+    out_prefix = outdir.rstrip(os.sep) + os.sep
+    fname = timestamped_filename(out_prefix)
     picam2.capture_file(fname)
-    # Annotate image with timestamp (draw on image) if Pillow available
-    ts_text = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    annotated = _annotate_image_with_timestamp(fname, text=ts_text)
-    if annotated:
-        print("Annotated with timestamp:", ts_text)
+    # Annotate image with timestamp (only when the pre_callback isn't doing it)
+    if annotate:
+        ts_text = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        annotated = _annotate_image_with_timestamp(fname, text=ts_text)
+        if annotated:
+            print("Annotated with timestamp:", ts_text)
     print("Saved:", fname)
     if scp_config:
         _scp_upload(fname, **scp_config)
@@ -265,47 +558,108 @@ def single_capture(picam2, outdir, scp_config=None, build_index=False, index_tit
         if idx and scp_config:
             _scp_upload(idx, **scp_config)
 
-def timelapse_capture(picam2, outdir, interval, count, scp_config=None, build_index=False, index_title="Image Index"):
+def timelapse_capture(picam2, outdir, interval, count, scp_config=None, build_index=False, index_title="Image Index", batch_size=16, annotate=True):
     ensure_outdir(outdir)
+    out_prefix = outdir.rstrip(os.sep) + os.sep
     i = 0
+    # Captured files wait here and go out in one tar stream per batch_size
+    # frames instead of one scp (and one SSH handshake) per image
+    pending = []
+    pending_lock = threading.Lock()
+    indexer = IndexBuilder(outdir, title=index_title) if build_index else None
+    # Annotation (JPEG decode + draw + re-encode) and uploads used to run
+    # inline, so the real interval was interval + encode + network. Two
+    # workers handle those off the capture thread; the semaphore caps how
+    # many frames can be in flight so a slow network can't pile them up.
+    pool = ThreadPoolExecutor(max_workers=2)
+    slots = threading.Semaphore(4)
+    scratch = _scratch_dir()
+
+    def _postprocess(cap_path, fname, ts_text):
+        try:
+            if annotate:
+                annotated = _annotate_image_with_timestamp(cap_path, text=ts_text)
+                if annotated:
+                    print(f"Annotated with timestamp: {ts_text}")
+            if cap_path != fname:
+                # tmpfs and the SD card are different filesystems, so
+                # os.replace would fail with EXDEV; shutil.move copies over
+                shutil.move(cap_path, fname)
+            if scp_config:
+                flush = None
+                with pending_lock:
+                    pending.append(fname)
+                    if len(pending) >= batch_size:
+                        flush = list(pending)
+                        pending.clear()
+                if flush:
+                    _batch_upload(flush, **scp_config)
+        except Exception as e:
+            # nobody checks the Future, so anything escaping here (e.g. the
+            # tmpfs-to-SD move failing on a full card) would vanish silently
+            print(f"Postprocessing failed for {fname}:", e)
+        finally:
+            slots.release()
+
+    start = time.monotonic()
     try:
         while count is None or i < count:
-            fname = timestamped_filename(outdir, prefix=f"img{i:04d}")
-            picam2.capture_file(fname)
+            fname = timestamped_filename(out_prefix, prefix=f"img{i:04d}")
+            # capture into tmpfs when available; the worker moves the file
+            # to outdir so the SD flush overlaps with the next capture
+            cap_path = os.path.join(scratch, os.path.basename(fname)) if scratch else fname
+            picam2.capture_file(cap_path)
             ts_text = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            annotated = _annotate_image_with_timestamp(fname, text=ts_text)
-            if annotated:
-                print(f"[{i+1}] Annotated with timestamp: {ts_text}")
             print(f"[{i+1}] Saved: {fname}")
-            #if scp_config:
-            #    _scp_upload(fname, **scp_config)
-            if build_index:
-                idx = build_index_html(outdir, title=index_title)
-            #    if idx and scp_config:
-            #        _scp_upload(idx, **scp_config)
+            if indexer:
+                # same basename either way, so stat'ing the scratch copy is
+                # fine - but it must happen before the worker moves the file
+                # out of tmpfs, or the stat races the move and loses frames
+                indexer.add(cap_path)
+                # refresh the page every 20 frames; no point rewriting it
+                # (or rescanning the directory) for every single capture
+                if (i + 1) % 20 == 0:
+                    indexer.write()
+            slots.acquire()
+            pool.submit(_postprocess, cap_path, fname, ts_text)
             i += 1
-            time.sleep(interval)
+            # Sleep until the next deadline rather than a flat
+            # sleep(interval) - otherwise capture time piles up as drift
+            # and the real cadence becomes interval + capture overhead
+            target = start + i * interval
+            delay = target - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                print(f"Warning: frame {i + 1} running {-delay:.2f}s behind schedule")
     except KeyboardInterrupt:
         print("Timelapse interrupted by user.")
-
-def button_capture(picam2, outdir, button_pin, scp_config=None, build_index=False, index_title="Image Index", bouncetime=300):
-    if not GPIO_AVAILABLE:
-        print("RPi.GPIO module not available. Install RPi.GPIO to use button mode.")
+    finally:
+        # let in-flight annotate/upload jobs finish, then flush the last batch
+        pool.shutdown(wait=True)
+        if pending and scp_config:
+            _batch_upload(pending, **scp_config)
+        if indexer:
+            indexer.write()
+
+def button_capture(picam2, outdir, button_pin, scp_config=None, build_index=False, index_title="Image Index", bouncetime=300, annotate=True):
+    if not GPIOZERO_AVAILABLE and not GPIO_AVAILABLE:
+        print("Neither gpiozero nor RPi.GPIO available. Install one to use button mode.")
         return
 
     ensure_outdir(outdir)
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setup(button_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-
-    print(f"Waiting for button presses on GPIO {button_pin}. Ctrl-C to quit.")
+    # precomputed once; the handler runs on the GPIO callback thread where
+    # every bit of per-press work adds trigger-to-capture latency
+    out_prefix = outdir.rstrip(os.sep) + os.sep
 
-    def handler(channel):
-        fname = timestamped_filename(outdir, prefix="btn")
+    def handler(channel=None):
+        fname = timestamped_filename(out_prefix, prefix="btn")
         picam2.capture_file(fname)
-        ts_text = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        annotated = _annotate_image_with_timestamp(fname, text=ts_text)
-        if annotated:
-            print("Button pressed — annotated with timestamp:", ts_text)
+        if annotate:
+            ts_text = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            annotated = _annotate_image_with_timestamp(fname, text=ts_text)
+            if annotated:
+                print("Button pressed — annotated with timestamp:", ts_text)
         print("Button pressed — saved:", fname)
         if scp_config:
             _scp_upload(fname, **scp_config)
@@ -314,7 +668,16 @@ def button_capture(picam2, outdir, button_pin, scp_config=None, build_index=Fals
             if idx and scp_config:
                 _scp_upload(idx, **scp_config)
 
-    GPIO.add_event_detect(button_pin, GPIO.FALLING, callback=handler, bouncetime=bouncetime)
+    btn = None
+    if GPIOZERO_AVAILABLE:
+        btn = Button(button_pin, pull_up=True, bounce_time=0.03)
+        btn.when_pressed = handler
+    else:
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(button_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        GPIO.add_event_detect(button_pin, GPIO.FALLING, callback=handler, bouncetime=bouncetime)
+
+    print(f"Waiting for button presses on GPIO {button_pin}. Ctrl-C to quit.")
 
     try:
         while True:
@@ -322,7 +685,10 @@ def button_capture(picam2, outdir, button_pin, scp_config=None, build_index=Fals
     except KeyboardInterrupt:
         print("Exiting button capture.")
     finally:
-        GPIO.cleanup()
+        if btn is not None:
+            btn.close()
+        else:
+            GPIO.cleanup()
 
 def main():
     parser = argparse.ArgumentParser(description="Capture images from Pi camera using Picamera2")
@@ -371,6 +737,13 @@ def main():
             "ssh_key": args.ssh_key,
             "ssh_port": args.ssh_port,
         }
+        # One handshake now; every upload below reuses the connection
+        _start_ssh_master(**scp_config)
+        # remote_path never changes during a run, so mkdir -p it once here
+        # rather than before every single upload
+        scp_config["_dir_ok"] = _ensure_remote_dir(**scp_config)
+        # Persistent SFTP session when paramiko is around - no scp fork per file
+        _open_sftp(**scp_config)
 
     # Create and configure camera
     picam2 = Picamera2()
@@ -381,6 +754,16 @@ def main():
         cfg = picam2.create_still_configuration()
     picam2.configure(cfg)
 
+    # Stamp the timestamp on the raw frame before JPEG encoding instead of
+    # decoding and re-encoding every saved file afterwards
+    stamp_in_camera = False
+    if PIL_AVAILABLE:
+        try:
+            picam2.pre_callback = _stamp_callback
+            stamp_in_camera = True
+        except Exception as e:
+            print("Could not set pre_callback; will annotate files after saving:", e)
+
     # Start camera and give AE/AGC a moment to settle
     picam2.start()
     time.sleep(1.5)
@@ -391,18 +774,21 @@ def main():
 
     try:
         if args.single:
-            single_capture(picam2, args.outdir, scp_config=scp_config, build_index=args.build_index, index_title=args.index_title)
+            single_capture(picam2, args.outdir, scp_config=scp_config, build_index=args.build_index, index_title=args.index_title, annotate=not stamp_in_camera)
         elif args.timelapse:
-            timelapse_capture(picam2, args.outdir, args.interval, args.count, scp_config=scp_config, build_index=args.build_index, index_title=args.index_title)
+            timelapse_capture(picam2, args.outdir, args.interval, args.count, scp_config=scp_config, build_index=args.build_index, index_title=args.index_title, annotate=not stamp_in_camera)
         elif args.button:
-            button_capture(picam2, args.outdir, args.button_pin, scp_config=scp_config, build_index=args.build_index, index_title=args.index_title)
+            button_capture(picam2, args.outdir, args.button_pin, scp_config=scp_config, build_index=args.build_index, index_title=args.index_title, annotate=not stamp_in_camera)
     finally:
         # added by pete to create the index at theend and upload all at once
         #if build_index:
         idx = build_index_html(args.outdir, title="Owl Box Timelapse Image Index")
         if idx and scp_config:
             print ("inside idx if")
-            _scp_upload(idx, **scp_config)  
+            _scp_upload(idx, **scp_config)
+        if scp_config:
+            _close_sftp()
+            _stop_ssh_master(**scp_config)
     picam2.stop()
 
 if __name__ == "__main__":